@@ -0,0 +1,32 @@
+"""
+Database connection helper shared by the API (main.py), the migration runner
+(migrate.py) and the query-plan tests.
+"""
+import os
+import psycopg2
+from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
+
+def get_db_connection(database_url=None):
+    """Establishes a connection to the PostgreSQL database (DATABASE_URL by default)."""
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL environment variable is not set.")
+    try:
+        # Sanitize DATABASE_URL: psycopg2 doesn't recognize the 'pgbouncer' parameter
+        url = database_url.strip().strip('"').strip("'").strip()
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+
+        # Remove pgbouncer and ensure sslmode=require unless set explicitly
+        query.pop('pgbouncer', None)
+        if 'sslmode' not in query:
+            query['sslmode'] = ['require']
+
+        new_query = urlencode(query, doseq=True)
+        sanitized_url = urlunparse(parsed._replace(query=new_query))
+
+        conn = psycopg2.connect(sanitized_url, connect_timeout=10)
+        return conn
+    except psycopg2.OperationalError as e:
+        print(f"❌ Could not connect to the database: {e}")
+        raise
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from openai import OpenAI, APIStatusError
@@ -9,11 +9,14 @@ import pandas as pd
 from pypdf import PdfReader
 from docx import Document
 import io
+import time
 import psycopg2
 from psycopg2.extras import execute_values, RealDictCursor
 from typing import List, Dict, Any, Optional
-from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 from datetime import datetime
+import queries
+from db import get_db_connection
+from prefill import STRUCTURED_EXTENSIONS, ACTIVITY_STATUSES, prefill_structured_updates, merge_prefilled_updates
 
 # --- CONFIGURATION ---
 ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
@@ -23,13 +26,14 @@ api_key = os.getenv("OPENAI_API_KEY")
 if api_key:
     api_key = api_key.strip()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if DATABASE_URL:
-    DATABASE_URL = DATABASE_URL.strip().strip('"').strip("'").strip()
-
 # Static context files can still be read from the filesystem
 CTX_DEFINITIONS = "context/logframe_definitions.txt"
 
+# gpt-4o input pricing (USD per 1M tokens); cached prompt tokens are billed at the lower rate
+MODEL = "gpt-4o"
+INPUT_PRICE_PER_M = 2.50
+CACHED_INPUT_PRICE_PER_M = 1.25
+
 app = FastAPI()
 
 # --- CORS SETUP ---
@@ -51,43 +55,22 @@ app.add_middleware(
 
 client = OpenAI(api_key=api_key)
 
-# --- DATABASE HELPERS ---
-
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable is not set.")
-    try:
-        # Sanitize DATABASE_URL: psycopg2 doesn't recognize the 'pgbouncer' parameter
-        url = DATABASE_URL.strip().strip('"').strip("'").strip()
-        parsed = urlparse(url)
-        query = parse_qs(parsed.query)
-
-        # Remove pgbouncer and ensure sslmode=require
-        query.pop('pgbouncer', None)
-        if 'sslmode' not in query:
-            query['sslmode'] = ['require']
-
-        new_query = urlencode(query, doseq=True)
-        sanitized_url = urlunparse(parsed._replace(query=new_query))
-
-        conn = psycopg2.connect(sanitized_url)
-        return conn
-    except psycopg2.OperationalError as e:
-        print(f"❌ Could not connect to the database: {e}")
-        raise
-
 # --- CONTEXT LOADING HELPERS (from Database) ---
 
 def load_project_ids():
-    """Load Logframe Indicators and Activities from the database for AI context."""
+    """
+    Load Logframe Indicators and Activities from the database for AI context.
+    Returns (definitions, activity_status): definitions only change with the logframe,
+    so they belong in the cacheable prompt prefix; current statuses change on every commit.
+    """
     context_text = ""
+    status_text = ""
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             # Load Logframe Indicators
-            cur.execute("SELECT id, parent_id, parent_desc, label, baseline, targets FROM logframe_indicators ORDER BY id;")
+            cur.execute(queries.SELECT_LOGFRAME_INDICATORS)
             logframe = cur.fetchall()
             
             context_text += "=== LOGFRAME STRUCTURE (INDICATOR DEFINITIONS) ===\n\n"
@@ -105,34 +88,55 @@ def load_project_ids():
                 context_text += f"    Yearly Targets: 2024={targets.get('2024', 0)}, 2025={targets.get('2025', 0)}, 2026={targets.get('2026', 0)}, 2027={targets.get('2027', 0)}\n"
 
             # Load Activities
-            cur.execute("SELECT id, name, status FROM activities ORDER BY id;")
+            cur.execute(queries.SELECT_ACTIVITIES)
             activities = cur.fetchall()
             context_text += "\n\n=== VALID ACTIVITY IDs ===\n"
+            status_text += "=== CURRENT ACTIVITY STATUS ===\n"
             for item in activities:
-                context_text += f"  • ID: {item['id']} | Name: {item['name']} | Current Status: {item['status']}\n"
+                context_text += f"  • ID: {item['id']} | Name: {item['name']}\n"
+                status_text += f"  • ID: {item['id']} | Current Status: {item['status']}\n"
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Error loading project IDs: {error}")
-        return "Error: Could not load project IDs from database."
+        return "Error: Could not load project IDs from database.", ""
     finally:
         if conn:
             conn.close()
-    return context_text
+    return context_text, status_text
 
-def load_rag_knowledge():
-    """Load static definitions and dynamic AI corrections from the database."""
-    rag_text = ""
-    # 1. Static Project Definitions from file
+def load_reference_ids():
+    """Load the sets of valid indicator and activity IDs for deterministic matching."""
+    indicator_ids, activity_ids = set(), set()
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(queries.SELECT_INDICATOR_IDS)
+            indicator_ids = {row[0] for row in cur.fetchall()}
+            cur.execute(queries.SELECT_ACTIVITY_IDS)
+            activity_ids = {row[0] for row in cur.fetchall()}
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Error loading reference IDs: {error}")
+    finally:
+        if conn:
+            conn.close()
+    return indicator_ids, activity_ids
+
+def load_rulebook():
+    """Load the static project rules & definitions file."""
     if os.path.exists(CTX_DEFINITIONS):
         with open(CTX_DEFINITIONS, "r") as f:
-            rag_text += f"\n=== PROJECT RULES & DEFINITIONS ===\n{f.read()}\n"
+            return f"\n=== PROJECT RULES & DEFINITIONS ===\n{f.read()}\n"
+    return ""
 
-    # 2. Dynamic Past Corrections (Memory) from Database
+def load_rag_knowledge():
+    """Load dynamic AI corrections (past mistakes) from the database."""
+    rag_text = ""
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT correction_rule FROM ai_corrections ORDER BY created_at DESC LIMIT 20;")
+            cur.execute(queries.SELECT_RECENT_CORRECTIONS)
             corrections = cur.fetchall()
             if corrections:
                 rag_text += "\n=== PAST MISTAKES TO AVOID (RULES) ===\n"
@@ -157,21 +161,12 @@ def load_budget_context():
         conn = get_db_connection()
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             # Calculate cumulative spent
-            cur.execute("SELECT SUM(amount) as total FROM expenditures;")
+            cur.execute(queries.SELECT_TOTAL_SPENT)
             total_spent = cur.fetchone()['total'] or 0
             context += f"Cumulative Spent to Date: ${total_spent:,.2f}\n\n"
 
             # Get planned and spent per activity
-            query = """
-            SELECT 
-                bp.activity_id,
-                SUM(bp.planned_amount) as planned,
-                (SELECT SUM(e.amount) FROM expenditures e WHERE e.activity_id = bp.activity_id) as spent
-            FROM budget_plan bp
-            GROUP BY bp.activity_id
-            ORDER BY bp.activity_id;
-            """
-            cur.execute(query)
+            cur.execute(queries.SELECT_BUDGET_SUMMARY)
             budget_summary = cur.fetchall()
 
             context += "Activity Budget Status:\n"
@@ -188,6 +183,32 @@ def load_budget_context():
             conn.close()
     return context
 
+def record_ai_usage(endpoint: str, response, latency_ms: int):
+    """
+    Store token usage (incl. provider-side cached prompt tokens) for one model call.
+    Scheduled as a background task so the insert runs after the response is sent;
+    background tasks are dropped when the endpoint fails, so error paths call it directly.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                queries.INSERT_AI_USAGE,
+                (endpoint, MODEL, usage.prompt_tokens, cached_tokens, usage.completion_tokens, latency_ms)
+            )
+        conn.commit()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Error recording AI usage: {error}")
+    finally:
+        if conn:
+            conn.close()
+
 # --- HELPER 2: TEXT EXTRACTION ---
 def extract_text_from_file(file_content: bytes, filename: str) -> str:
     file_stream = io.BytesIO(file_content)
@@ -230,7 +251,7 @@ class CorrectionFeedback(BaseModel):
 # --- ENDPOINTS ---
 
 @app.post("/analyze-report")
-async def analyze_report(file: UploadFile = File(...)):
+async def analyze_report(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     if not api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured.")
 
@@ -238,35 +259,61 @@ async def analyze_report(file: UploadFile = File(...)):
     content = await file.read()
     raw_text = extract_text_from_file(content, file.filename)
 
-    # 2. Load Context (RAG + IDs + Budget)
-    ids_list = load_project_ids()
+    # 2. Deterministic fast path for structured uploads (Excel tables, JSON exports)
+    prefilled = None
+    if file.filename.endswith(STRUCTURED_EXTENSIONS):
+        indicator_ids, activity_ids = load_reference_ids()
+        prefilled = prefill_structured_updates(content, file.filename, indicator_ids, activity_ids)
+    if prefilled:
+        if not prefilled["residual_text"].strip() and prefilled["date"]:
+            return {
+                "date": prefilled["date"],
+                "source": file.filename,
+                "indicator_updates": prefilled["indicator_updates"],
+                "activity_updates": prefilled["activity_updates"],
+                "budget_updates": [],
+            }
+        # Only the unmatched rows/objects go to the model; without a reporting
+        # date it needs the whole report to find one
+        if prefilled["residual_text"].strip() and prefilled["date"]:
+            raw_text = prefilled["residual_text"]
+
+    # 3. Load Context (Rulebook + IDs + RAG + Budget)
+    ids_list, activity_status = load_project_ids()
+    rulebook = load_rulebook()
     knowledge_base = load_rag_knowledge()
     budget_context = load_budget_context()
 
-    # 3. Prompt
+    prefilled_note = ""
+    if prefilled:
+        done_ids = [item["id"] for item in prefilled["indicator_updates"] + prefilled["activity_updates"]]
+        prefilled_note = f"ALREADY EXTRACTED (do NOT repeat these IDs): {', '.join(done_ids)}"
+
+    # 4. Prompt
+    # The system message only holds content that is identical across requests
+    # (rulebook, logframe definitions, output schema) so the provider's automatic
+    # prompt caching can reuse it; everything request-specific goes after it.
     system_prompt = f"""
     You are the Senior M&E Database Manager for DigiGreen.
 
-    === YOUR KNOWLEDGE BASE (RULES & MISTAKES) ===
-    {knowledge_base}
+    === YOUR KNOWLEDGE BASE (RULES) ===
+    {rulebook}
 
     === REFERENCE DATA (ONLY USE THESE IDs) ===
     {ids_list}
 
-    {budget_context}
-
     TASK:
     Analyze the report. Extract updates for INDICATORS, ACTIVITIES, and BUDGET expenditures.
+    Also apply the past mistakes and budget status given with the report.
 
     OUTPUT FORMAT (Strict JSON):
     {{
         "date": "YYYY-MM-DD",
-        "source": "{file.filename}",
         "indicator_updates": [
             {{ "id": "MATCHING_ID", "value": <number>, "narrative": "<explanation>" }}
         ],
         "activity_updates": [
-            {{ "id": "MATCHING_ID", "status": "<Delayed/On Track/Completed>", "progress": <0-100>, "notes": "<reason>" }}
+            {{ "id": "MATCHING_ID", "status": "<{'/'.join(ACTIVITY_STATUSES)}>", "progress": <0-100>, "notes": "<reason>" }}
         ],
         "budget_updates": [
             {{ "activity_id": "MATCHING_ID", "amount": <number>, "year": <2024|2025|2026|2027>, "category": "<Equipment/Training/etc>", "description": "<what was purchased>" }}
@@ -280,27 +327,55 @@ async def analyze_report(file: UploadFile = File(...)):
     - If no budget data found, return empty budget_updates array
     """
 
+    request_prompt = f"""
+    {knowledge_base}
+
+    {activity_status}
+
+    {budget_context}
+
+    {prefilled_note}
+
+    REPORT FILE: {file.filename}
+
+    Analyze this report:
+
+    {raw_text[:15000]}
+    """
+
+    response, latency_ms = None, 0
     try:
+        started = time.perf_counter()
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze this report:\n\n{raw_text[:15000]}"}
+                {"role": "user", "content": request_prompt}
             ],
             temperature=0,
             response_format={"type": "json_object"}
         )
-        return json.loads(response.choices[0].message.content)
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        result = json.loads(response.choices[0].message.content)
+        result["source"] = file.filename
+        if prefilled:
+            result = merge_prefilled_updates(result, prefilled)
+        background_tasks.add_task(record_ai_usage, "analyze-report", response, latency_ms)
+        return result
 
     except APIStatusError as e:
         print(f"OpenAI API Error: {e.status_code} - {e.response}")
         raise HTTPException(status_code=e.status_code, detail=f"OpenAI API error: {e.message}")
     except Exception as e:
         print(f"AI Error: {e}")
+        # The call was billed even though the reply could not be used
+        if response is not None:
+            record_ai_usage("analyze-report", response, latency_ms)
         raise HTTPException(status_code=500, detail=f"Failed to analyze report: {str(e)}")
 
 @app.post("/learn-mistake")
-async def learn_mistake(feedback: CorrectionFeedback):
+async def learn_mistake(feedback: CorrectionFeedback, background_tasks: BackgroundTasks):
+    response, latency_ms = None, 0
     try:
         learning_prompt = f"""
         Analyze this mistake to create a general rule for future reports.
@@ -317,11 +392,13 @@ async def learn_mistake(feedback: CorrectionFeedback):
         Example: "IF report mentions 'enrolled', THEN count is 0 until certified."
         """
         
+        started = time.perf_counter()
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=MODEL,
             messages=[{"role": "system", "content": learning_prompt}],
             temperature=0
         )
+        latency_ms = int((time.perf_counter() - started) * 1000)
         
         new_rule = response.choices[0].message.content.strip()
         
@@ -331,13 +408,11 @@ async def learn_mistake(feedback: CorrectionFeedback):
             conn = get_db_connection()
             with conn.cursor() as cur:
                 cur.execute(
-                    """
-                    INSERT INTO ai_corrections (correction_rule, original_text, ai_prediction, user_correction, comments)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
+                    queries.INSERT_CORRECTION,
                     (new_rule, feedback.original_text, json.dumps(feedback.ai_prediction), json.dumps(feedback.user_correction), feedback.comments)
                 )
             conn.commit()
+            background_tasks.add_task(record_ai_usage, "learn-mistake", response, latency_ms)
             return {"status": "success", "new_rule": new_rule}
         except (Exception, psycopg2.DatabaseError) as db_error:
             print(f"Database Error during learning: {db_error}")
@@ -348,6 +423,8 @@ async def learn_mistake(feedback: CorrectionFeedback):
 
     except Exception as e:
         print(f"Learning Error: {e}")
+        if response is not None:
+            record_ai_usage("learn-mistake", response, latency_ms)
         raise HTTPException(status_code=500, detail=f"Failed to process learning feedback: {str(e)}")
 
 @app.post("/commit-data")
@@ -363,7 +440,7 @@ async def commit_data(data: ValidatedUpdate):
                     for item in data.indicator_updates if 'value' in item and item['value'] is not None
                 ]
                 if perf_values:
-                    execute_values(cur, "INSERT INTO performance_actuals (indicator_id, date, source, value) VALUES %s", perf_values)
+                    execute_values(cur, queries.INSERT_PERFORMANCE_ACTUALS, perf_values)
 
             # 2. Save Indicator Narratives
             if data.indicator_updates:
@@ -372,7 +449,7 @@ async def commit_data(data: ValidatedUpdate):
                     for item in data.indicator_updates if 'narrative' in item and item['narrative']
                 ]
                 if narr_values:
-                    execute_values(cur, "INSERT INTO narratives (indicator_id, date, source, status, narrative) VALUES %s", narr_values)
+                    execute_values(cur, queries.INSERT_NARRATIVES, narr_values)
 
             # 3. Save Activity Updates
             if data.activity_updates:
@@ -381,15 +458,7 @@ async def commit_data(data: ValidatedUpdate):
                     for item in data.activity_updates
                 ]
                 if update_values:
-                    execute_values(cur, 
-                        """
-                        UPDATE activities SET progress = data.progress, status = data.status, notes = data.notes, last_updated = data.last_updated::timestamptz
-                        FROM (VALUES %s) AS data(progress, status, notes, last_updated, id)
-                        WHERE activities.id = data.id;
-                        """, 
-                        update_values,
-                        template="(%s, %s, %s, %s, %s)"
-                    )
+                    execute_values(cur, queries.UPDATE_ACTIVITIES, update_values, template=queries.UPDATE_ACTIVITIES_TEMPLATE)
 
             # 4. Save Budget Expenditures
             if data.budget_updates:
@@ -398,7 +467,7 @@ async def commit_data(data: ValidatedUpdate):
                     for item in data.budget_updates if 'amount' in item and item['amount'] is not None
                 ]
                 if exp_values:
-                    execute_values(cur, "INSERT INTO expenditures (activity_id, amount, expenditure_date, description) VALUES %s", exp_values)
+                    execute_values(cur, queries.INSERT_EXPENDITURES, exp_values)
 
         conn.commit()
         return {"status": "success"}
@@ -412,6 +481,39 @@ async def commit_data(data: ValidatedUpdate):
         if conn:
             conn.close()
 
+@app.get("/ai-usage")
+def ai_usage(days: int = Query(30, ge=1, le=365)):
+    """Prompt-cache hit rate, latency and estimated savings per endpoint over the last `days` days."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(queries.SELECT_AI_USAGE_SUMMARY, (days,))
+            rows = cur.fetchall()
+    except (Exception, psycopg2.DatabaseError) as e:
+        print(f"Usage Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
+
+    summary = []
+    for row in rows:
+        prompt_tokens = row['prompt_tokens'] or 0
+        cached_tokens = row['cached_tokens'] or 0
+        summary.append({
+            "endpoint": row['endpoint'],
+            "calls": row['calls'],
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": row['completion_tokens'] or 0,
+            "cache_hit_rate": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0,
+            "avg_latency_ms_cached": round(float(row['avg_latency_ms_cached']), 1) if row['avg_latency_ms_cached'] is not None else None,
+            "avg_latency_ms_uncached": round(float(row['avg_latency_ms_uncached']), 1) if row['avg_latency_ms_uncached'] is not None else None,
+            "estimated_savings_usd": round(cached_tokens * (INPUT_PRICE_PER_M - CACHED_INPUT_PRICE_PER_M) / 1_000_000, 4),
+        })
+    return {"days": days, "endpoints": summary}
+
 @app.get("/")
 def health_check():
     return {"status": "DigiGreen Brain Online", "mode": "RAG + Self-Learning Enabled"}
\ No newline at end of file
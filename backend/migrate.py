@@ -0,0 +1,86 @@
+"""
+Versioned schema migrations for the DigiGreen database.
+
+Migrations live in backend/migrations/ as NNNN_description.sql and are applied
+in order, each in its own transaction. Applied versions are recorded in the
+schema_migrations table.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+"""
+import os
+import re
+import sys
+import psycopg2
+from dotenv import load_dotenv
+from db import get_db_connection
+
+# --- CONFIGURATION ---
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+def list_migrations():
+    """Return (version, name, path) for every migration file, in version order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def applied_versions(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(4) PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT now() NOT NULL
+            );
+        """)
+        cur.execute("SELECT version FROM schema_migrations;")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+def apply_migrations(conn, verbose=True):
+    """Apply all pending migrations; returns the list of versions applied."""
+    done = applied_versions(conn)
+    applied = []
+    for version, name, path in list_migrations():
+        if version in done:
+            continue
+        with open(path, "r") as f:
+            sql = f.read()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+            conn.commit()
+        except psycopg2.DatabaseError:
+            conn.rollback()
+            print(f"❌ Migration {version}_{name} failed; rolled back.")
+            raise
+        applied.append(version)
+        if verbose:
+            print(f"  ✅ Applied {version}_{name}")
+    return applied
+
+def print_status(conn):
+    done = applied_versions(conn)
+    for version, name, _ in list_migrations():
+        state = "applied" if version in done else "pending"
+        print(f"  {version}_{name}: {state}")
+
+if __name__ == "__main__":
+    conn = get_db_connection()
+    try:
+        if "--status" in sys.argv[1:]:
+            print_status(conn)
+        else:
+            applied = apply_migrations(conn)
+            print(f"🎉 {len(applied)} migration(s) applied." if applied else "Database is up to date.")
+    finally:
+        conn.close()
@@ -0,0 +1,12 @@
+-- Migration 0002: indexes for the hot API queries (see backend/queries.py)
+
+-- load_budget_context: per-activity SUM(amount) subquery, and the
+-- ON DELETE SET NULL check when an activity is removed. INCLUDE (amount)
+-- lets the sum be answered from the index alone.
+CREATE INDEX IF NOT EXISTS idx_expenditures_activity_id
+    ON expenditures(activity_id) INCLUDE (amount);
+
+-- load_rag_knowledge: latest 20 rules, ORDER BY created_at DESC LIMIT 20.
+CREATE INDEX IF NOT EXISTS idx_ai_corrections_created_at
+    ON ai_corrections(created_at DESC);
+
@@ -0,0 +1,17 @@
+-- Migration 0003: per-call model token usage, incl. provider-side cached prompt tokens
+
+CREATE TABLE IF NOT EXISTS ai_usage (
+    id SERIAL PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER DEFAULT 0 NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now() NOT NULL
+);
+
+COMMENT ON TABLE ai_usage IS 'Token usage and latency of each model call, for tracking prompt-cache hit rate.';
+
+-- /ai-usage: summary over a recent created_at window.
+CREATE INDEX IF NOT EXISTS idx_ai_usage_created_at ON ai_usage(created_at);
@@ -0,0 +1,336 @@
+"""
+Deterministic pre-extraction for structured uploads (Excel tables, JSON exports).
+
+These files often already hold explicit "ID -> value" pairs. They are matched
+against the logframe without the LLM; whatever cannot be matched safely is
+returned as `residual_text` for the model.
+"""
+import re
+import io
+import json
+import numbers
+import pandas as pd
+from typing import List, Dict, Any, Optional
+
+STRUCTURED_EXTENSIONS = (".xlsx", ".xls", ".json")
+
+# Shared with the review UI: keep in sync with ACTIVITY_STATUSES in src/types/activity.ts
+ACTIVITY_STATUSES = ["Not Started", "On Track", "Delayed", "Critical", "Completed", "Exceeded"]
+
+INDICATOR_ID_KEYS = ["indicator id", "indicator code", "indicator"]
+ACTIVITY_ID_KEYS = ["activity id", "activity code", "activity"]
+GENERIC_ID_KEYS = ["id", "code"]
+VALUE_KEYS = ["value", "actual", "actual value", "achieved", "achievement", "result", "cumulative"]
+PROGRESS_KEYS = ["progress", "progress %", "% complete", "percent complete", "completion"]
+STATUS_KEYS = ["status", "current status"]
+NOTE_KEYS = ["narrative", "notes", "note", "comments", "comment", "remarks"]
+DATE_KEYS = ["date", "reporting date", "report date", "as of"]
+# Fields that may sit next to matched data without carrying anything the model must see
+METADATA_KEYS = set(DATE_KEYS + ["source", "title", "report title", "project title"])
+DESCRIPTIVE_KEYS = ["label", "name", "target", "baseline", "unit"]
+RECORD_KEYS = set(
+    INDICATOR_ID_KEYS + ACTIVITY_ID_KEYS + GENERIC_ID_KEYS + VALUE_KEYS + PROGRESS_KEYS
+    + STATUS_KEYS + NOTE_KEYS + DESCRIPTIVE_KEYS
+) | METADATA_KEYS
+QUARTER_END = {"1": "03-31", "2": "06-30", "3": "09-30", "4": "12-31"}
+
+CONFIDENCE_RECORD = 0.95        # Indicator/activity-specific ID field with a dotted ID
+CONFIDENCE_MAPPING = 0.9        # {"<indicator id>": <number>} mapping
+CONFIDENCE_GENERIC = 0.8        # Generic "id"/"code" field with a dotted ID
+CONFIDENCE_BARE_INTEGER = 0.6   # Outcome IDs "1".."3" look exactly like row numbers
+
+def _norm_key(key) -> str:
+    return re.sub(r"[^a-z0-9%]+", " ", str(key).lower()).strip()
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+def _first_field(fields: Dict[str, Any], keys: List[str]):
+    for key in keys:
+        value = fields.get(key)
+        if not _is_missing(value):
+            return value
+    return None
+
+def match_id(value, valid_ids: set) -> Optional[str]:
+    """Return the canonical ID if `value` names one of `valid_ids`."""
+    if _is_missing(value) or isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Number):
+        value = float(value)
+        value = int(value) if value.is_integer() else value
+    candidate = re.sub(r"^(indicator|activity|ind\.?|act\.?)\s*", "", str(value).strip(), flags=re.IGNORECASE)
+    return candidate if candidate in valid_ids else None
+
+def _find_id(fields: Dict[str, Any], valid_ids: set, specific_keys: List[str], allow_generic: bool = True):
+    """
+    Try each candidate ID field until one names a valid ID.
+    Returns (id, confidence, generic) or None. Generic "id"/"code" fields only count
+    for dotted string IDs, since a bare 1/2/3 there is most likely a row number.
+    """
+    keys = specific_keys + (GENERIC_ID_KEYS if allow_generic else [])
+    for key in keys:
+        raw = fields.get(key)
+        matched = match_id(raw, valid_ids)
+        if matched is None:
+            continue
+        generic = key in GENERIC_ID_KEYS
+        if "." not in matched:
+            if generic:
+                continue
+            return matched, CONFIDENCE_BARE_INTEGER, False
+        if generic and not isinstance(raw, str):
+            continue
+        return matched, (CONFIDENCE_GENERIC if generic else CONFIDENCE_RECORD), generic
+    return None
+
+def parse_number(value):
+    if _is_missing(value) or isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Number):
+        number = float(value)
+    else:
+        match = re.fullmatch(r"\s*(-?[\d,]*\.?\d+)\s*%?\s*", str(value))
+        if not match:
+            return None
+        number = float(match.group(1).replace(",", ""))
+    if number != number:
+        return None
+    return int(number) if number.is_integer() else number
+
+def parse_date(value) -> Optional[str]:
+    """Read an ISO date, a date/timestamp object or a "Q2 2025" quarter (as its last day)."""
+    if _is_missing(value):
+        return None
+    if hasattr(value, "strftime"):
+        try:
+            return value.strftime("%Y-%m-%d")
+        except ValueError:  # pandas NaT
+            return None
+    text = str(value)
+    match = re.search(r"\b(\d{4}-\d{2}-\d{2})\b", text)
+    if match:
+        return match.group(1)
+    match = re.search(r"\bQ([1-4])\s*[-/]?\s*(\d{4})\b", text, flags=re.IGNORECASE)
+    if match:
+        return f"{match.group(2)}-{QUARTER_END[match.group(1)]}"
+    return None
+
+def _record_date(fields: Dict[str, Any]) -> Optional[str]:
+    for key in DATE_KEYS:
+        parsed = parse_date(fields.get(key))
+        if parsed:
+            return parsed
+    return None
+
+def match_status(value) -> Optional[str]:
+    if _is_missing(value):
+        return None
+    for status in ACTIVITY_STATUSES:
+        if str(value).strip().lower() == status.lower():
+            return status
+    return None
+
+def match_record(record: Dict[str, Any], indicator_ids: set, activity_ids: set):
+    """
+    Map one table row or JSON object onto an indicator or activity update.
+    Returns (list_name, update) or None. `update["_keep"]` marks records the model
+    must still see: matches through a generic "id"/"code" field, and records with
+    extra fields (e.g. an amount spent) that the rules do not extract.
+    """
+    fields = {_norm_key(k): v for k, v in record.items()}
+    value = parse_number(_first_field(fields, VALUE_KEYS))
+    notes = _first_field(fields, NOTE_KEYS)
+    notes = str(notes) if notes is not None else ""
+    date = _record_date(fields)
+    extra = any(k not in RECORD_KEYS and not _is_missing(v) for k, v in fields.items())
+
+    # Activities and indicators share the "1.1.1" ID pattern, so a generic "id" only
+    # counts as an activity when the record carries status/progress but no value.
+    activity = _find_id(fields, activity_ids, ACTIVITY_ID_KEYS, allow_generic=value is None)
+    status = match_status(_first_field(fields, STATUS_KEYS))
+    progress = parse_number(_first_field(fields, PROGRESS_KEYS))
+    if activity and status and progress is not None and 0 <= progress <= 100:
+        activity_id, confidence, generic = activity
+        return "activity_updates", {
+            "id": activity_id, "status": status, "progress": progress, "notes": notes,
+            "confidence": confidence, "_keep": generic or extra, "_date": date,
+        }
+
+    indicator = _find_id(fields, indicator_ids, INDICATOR_ID_KEYS)
+    if indicator and value is not None:
+        indicator_id, confidence, generic = indicator
+        return "indicator_updates", {
+            "id": indicator_id, "value": value, "narrative": notes,
+            "confidence": confidence, "_keep": generic or extra, "_date": date,
+        }
+    return None
+
+def locate_header(df: pd.DataFrame):
+    """
+    Skip title rows above the real header of an Excel progress table.
+    Returns (table, title_date) where title_date comes from the skipped title rows.
+    """
+    known = set(INDICATOR_ID_KEYS + ACTIVITY_ID_KEYS + GENERIC_ID_KEYS)
+    if any(_norm_key(col) in known for col in df.columns):
+        return df, None
+    for i in range(min(10, len(df))):
+        row = df.iloc[i]
+        if any(_norm_key(cell) in known for cell in row if isinstance(cell, str)):
+            table = df.iloc[i + 1:].copy()
+            table.columns = [str(cell) for cell in row]
+            # read_excel turns the first title row into the column names
+            title_cells = list(df.columns) + [cell for _, title in df.iloc[:i].iterrows() for cell in title]
+            title_date = next((d for d in (parse_date(cell) for cell in title_cells) if d), None)
+            return table, title_date
+    return df, None
+
+def _prefill_from_table(df: pd.DataFrame, indicator_ids: set, activity_ids: set, updates: Dict[str, list], dates: List[str]) -> str:
+    """Consume matching rows into `updates`; return the rows the model must still see as text."""
+    df, title_date = locate_header(df)
+    df = df.dropna(how="all")
+    leftover_rows = []
+    for idx, row in df.iterrows():
+        match = match_record(row.to_dict(), indicator_ids, activity_ids)
+        if match:
+            update = match[1]
+            update["_date"] = update["_date"] or title_date
+            updates[match[0]].append(update)
+            if update["_date"]:
+                dates.append(update["_date"])
+        if not match or match[1]["_keep"]:
+            leftover_rows.append(idx)
+    leftover = df.loc[leftover_rows]
+    return leftover.to_string() if not leftover.empty else ""
+
+def _prefill_from_json(node, indicator_ids: set, activity_ids: set, updates: Dict[str, list], dates: List[str], context_date=None):
+    """Consume matching objects into `updates`; return the unmatched residual (None if fully consumed)."""
+    if isinstance(node, dict):
+        context_date = _record_date({_norm_key(k): v for k, v in node.items()}) or context_date
+
+        match = match_record(node, indicator_ids, activity_ids)
+        if match:
+            update = match[1]
+            update["_date"] = update["_date"] or context_date
+            updates[match[0]].append(update)
+            if update["_date"]:
+                dates.append(update["_date"])
+            return node if update["_keep"] else None
+
+        matched_keys = [match_id(k, indicator_ids) for k in node]
+        if (node and all(matched_keys) and any("." in k for k in matched_keys)
+                and all(parse_number(v) is not None for v in node.values())):
+            for indicator_id, value in zip(matched_keys, node.values()):
+                updates["indicator_updates"].append({
+                    "id": indicator_id, "value": parse_number(value), "narrative": "",
+                    "confidence": CONFIDENCE_MAPPING if "." in indicator_id else CONFIDENCE_BARE_INTEGER,
+                    "_keep": False, "_date": context_date,
+                })
+            if context_date:
+                dates.append(context_date)
+            return None
+
+        residual, consumed = {}, False
+        for key, value in node.items():
+            child = _prefill_from_json(value, indicator_ids, activity_ids, updates, dates, context_date)
+            if child is None:
+                consumed = True
+            else:
+                residual[key] = child
+        # Only known metadata (date, source, title) may be dropped beside consumed data
+        if consumed and all(_norm_key(k) in METADATA_KEYS for k in residual):
+            return None
+        return residual
+
+    if isinstance(node, list):
+        residual = [child for child in (
+            _prefill_from_json(item, indicator_ids, activity_ids, updates, dates, context_date) for item in node
+        ) if child is not None]
+        return residual if residual or not node else None
+
+    return node
+
+def _split_updates(items: List[Dict[str, Any]], value_keys: List[str], report_date: Optional[str]):
+    """
+    Keep the most recently dated update per ID. IDs whose latest values conflict, or
+    whose latest value is dated differently from the report date (the single date
+    /commit-data stores), are returned as text lines for the model instead.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        groups.setdefault(item["id"], []).append(item)
+
+    kept, deferred = [], []
+    for item_id, group in groups.items():
+        latest = max(item["_date"] or "" for item in group)
+        distinct: Dict[tuple, Dict[str, Any]] = {}
+        for item in group:
+            if (item["_date"] or "") == latest:
+                distinct.setdefault(tuple(item[k] for k in value_keys), item)
+        described = "; ".join(
+            ", ".join(f"{k}={item[k]}" for k in value_keys) for item in distinct.values()
+        )
+        if len(distinct) > 1:
+            deferred.append(f"- {item_id}: conflicting values ({described}) dated {latest or 'unknown'}")
+        elif latest and report_date and latest != report_date:
+            deferred.append(f"- {item_id}: {described} dated {latest}")
+        else:
+            kept.extend(distinct.values())
+    return [{k: v for k, v in item.items() if not k.startswith("_")} for item in kept], deferred
+
+def prefill_structured_updates(file_content: bytes, filename: str, indicator_ids: set, activity_ids: set) -> Optional[Dict[str, Any]]:
+    """
+    Rule-based extraction for structured uploads (Excel/JSON).
+    Returns None for unstructured files or on parse errors, so the caller falls back to the model.
+    `residual_text` holds whatever still needs the model; the model can only be skipped
+    when it is empty and a reporting `date` was found in the file.
+    """
+    if not (indicator_ids or activity_ids):
+        return None
+    updates = {"indicator_updates": [], "activity_updates": []}
+    dates: List[str] = []
+    try:
+        if filename.endswith(".xlsx") or filename.endswith(".xls"):
+            df = pd.read_excel(io.BytesIO(file_content))
+            residual_text = _prefill_from_table(df, indicator_ids, activity_ids, updates, dates)
+        elif filename.endswith(".json"):
+            data = json.load(io.BytesIO(file_content))
+            residual = _prefill_from_json(data, indicator_ids, activity_ids, updates, dates)
+            residual_text = json.dumps(residual, indent=2, default=str) if residual else ""
+        else:
+            return None
+    except Exception as e:
+        print(f"Pre-extraction skipped for {filename}: {e}")
+        return None
+
+    report_date = max(dates) if dates else None
+    indicator_updates, deferred_indicators = _split_updates(updates["indicator_updates"], ["value"], report_date)
+    activity_updates, deferred_activities = _split_updates(updates["activity_updates"], ["status", "progress"], report_date)
+    deferred = deferred_indicators + deferred_activities
+    if deferred:
+        residual_text += (
+            f"\n\nVALUES NEEDING REVIEW (conflicting, or not dated {report_date or 'with the report date'}):\n"
+            + "\n".join(deferred)
+        )
+
+    if not (indicator_updates or activity_updates):
+        return None
+    return {
+        "date": report_date,
+        "indicator_updates": indicator_updates,
+        "activity_updates": activity_updates,
+        "residual_text": residual_text,
+    }
+
+def merge_prefilled_updates(result: Dict[str, Any], prefilled: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combine model output with pre-extracted updates; deterministic matches win on ID
+    clashes, and the date read from the file wins over the model's date.
+    """
+    for key in ("indicator_updates", "activity_updates"):
+        known = {item["id"] for item in prefilled[key]}
+        model_items = [item for item in result.get(key) or [] if item.get("id") not in known]
+        result[key] = prefilled[key] + model_items
+    if prefilled["date"]:
+        result["date"] = prefilled["date"]
+    return result
@@ -0,0 +1,60 @@
+"""
+SQL statements issued by the API (main.py).
+
+Kept in one place so tests/test_query_plans.py can EXPLAIN exactly the queries the
+endpoints run.
+"""
+
+# --- CONTEXT LOADING ---
+SELECT_LOGFRAME_INDICATORS = "SELECT id, parent_id, parent_desc, label, baseline, targets FROM logframe_indicators ORDER BY id;"
+SELECT_ACTIVITIES = "SELECT id, name, status FROM activities ORDER BY id;"
+SELECT_INDICATOR_IDS = "SELECT id FROM logframe_indicators;"
+SELECT_ACTIVITY_IDS = "SELECT id FROM activities;"
+SELECT_RECENT_CORRECTIONS = "SELECT correction_rule FROM ai_corrections ORDER BY created_at DESC LIMIT 20;"
+SELECT_TOTAL_SPENT = "SELECT SUM(amount) as total FROM expenditures;"
+SELECT_BUDGET_SUMMARY = """
+SELECT
+    bp.activity_id,
+    SUM(bp.planned_amount) as planned,
+    (SELECT SUM(e.amount) FROM expenditures e WHERE e.activity_id = bp.activity_id) as spent
+FROM budget_plan bp
+GROUP BY bp.activity_id
+ORDER BY bp.activity_id;
+"""
+
+# --- LEARNING ---
+INSERT_CORRECTION = """
+INSERT INTO ai_corrections (correction_rule, original_text, ai_prediction, user_correction, comments)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# --- COMMIT DATA (used with psycopg2.extras.execute_values) ---
+INSERT_PERFORMANCE_ACTUALS = "INSERT INTO performance_actuals (indicator_id, date, source, value) VALUES %s"
+INSERT_NARRATIVES = "INSERT INTO narratives (indicator_id, date, source, status, narrative) VALUES %s"
+UPDATE_ACTIVITIES = """
+UPDATE activities SET progress = data.progress, status = data.status, notes = data.notes, last_updated = data.last_updated::timestamptz
+FROM (VALUES %s) AS data(progress, status, notes, last_updated, id)
+WHERE activities.id = data.id;
+"""
+UPDATE_ACTIVITIES_TEMPLATE = "(%s, %s, %s, %s, %s)"
+INSERT_EXPENDITURES = "INSERT INTO expenditures (activity_id, amount, expenditure_date, description) VALUES %s"
+
+# --- AI USAGE ACCOUNTING ---
+INSERT_AI_USAGE = """
+INSERT INTO ai_usage (endpoint, model, prompt_tokens, cached_tokens, completion_tokens, latency_ms)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+SELECT_AI_USAGE_SUMMARY = """
+SELECT
+    endpoint,
+    COUNT(*) as calls,
+    SUM(prompt_tokens) as prompt_tokens,
+    SUM(cached_tokens) as cached_tokens,
+    SUM(completion_tokens) as completion_tokens,
+    AVG(latency_ms) FILTER (WHERE cached_tokens > 0) as avg_latency_ms_cached,
+    AVG(latency_ms) FILTER (WHERE cached_tokens = 0) as avg_latency_ms_uncached
+FROM ai_usage
+WHERE created_at >= now() - make_interval(days => %s)
+GROUP BY endpoint
+ORDER BY endpoint;
+"""
@@ -0,0 +1,217 @@
+"""
+Rule-based pre-extraction tests (prefill.py). No database or model needed.
+"""
+import io
+import os
+import re
+import json
+import pytest
+import pandas as pd
+from datetime import datetime
+from prefill import (
+    ACTIVITY_STATUSES, match_id, parse_date, match_status, match_record, locate_header,
+    prefill_structured_updates, merge_prefilled_updates,
+)
+
+INDICATOR_IDS = {"1", "2", "3", "1.1", "1.2", "2.1", "3.1"}
+ACTIVITY_IDS = {"1.1.1", "1.1.2", "2.1.1"}
+
+def excel_bytes(rows, header=True):
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False, header=header)
+    return buffer.getvalue()
+
+def json_bytes(data):
+    return json.dumps(data).encode()
+
+def prefill(content, filename):
+    return prefill_structured_updates(content, filename, INDICATOR_IDS, ACTIVITY_IDS)
+
+# --- ID MATCHING ---
+@pytest.mark.parametrize("value, expected", [
+    ("1.1", "1.1"),
+    ("Indicator 1.1", "1.1"),
+    ("Act. 1.1.1", "1.1.1"),
+    (2, "2"),
+    (2.0, "2"),
+    (1.1, "1.1"),
+    ("9.9", None),
+    (True, None),
+    (float("nan"), None),
+    (None, None),
+])
+def test_match_id(value, expected):
+    assert match_id(value, INDICATOR_IDS | ACTIVITY_IDS) == expected
+
+@pytest.mark.parametrize("record, expected", [
+    # Indicator-specific ID field: dotted IDs are trusted, bare outcome IDs are flagged
+    ({"Indicator ID": "1.1", "Value": 40}, ("indicator_updates", "1.1", 0.95, False)),
+    ({"Indicator": 2, "Actual": "1,200"}, ("indicator_updates", "2", 0.6, False)),
+    # Generic id/code fields: dotted strings only, and the model still sees the row
+    ({"ID": "1.2", "Value": 5}, ("indicator_updates", "1.2", 0.8, True)),
+    ({"id": 1, "value": 5}, None),
+    ({"code": 3, "amount": 250}, None),
+    ({"id": 1.1, "value": 5}, None),
+    # Activities need a known status and a 0-100 progress
+    ({"Activity ID": "1.1.1", "Status": "critical", "Progress %": "30%"}, ("activity_updates", "1.1.1", 0.95, False)),
+    ({"Activity ID": "1.1.2", "Status": "Exceeded", "Progress": 100}, ("activity_updates", "1.1.2", 0.95, False)),
+    ({"Activity ID": "1.1.1", "Status": "In Progress", "Progress": 30}, None),
+    ({"Activity ID": "1.1.1", "Status": "Delayed", "Progress": 130}, None),
+    # Extra columns the rules do not extract keep the record visible to the model
+    ({"Indicator ID": "1.1", "Value": 40, "Amount Spent (USD)": 1200}, ("indicator_updates", "1.1", 0.95, True)),
+    ({"Indicator ID": "1.1", "Value": 40, "Label": "Farmers trained", "Date": "2025-06-30"},
+        ("indicator_updates", "1.1", 0.95, False)),
+])
+def test_match_record(record, expected):
+    match = match_record(record, INDICATOR_IDS, ACTIVITY_IDS)
+    if expected is None:
+        assert match is None
+        return
+    list_name, item_id, confidence, keep = expected
+    assert match[0] == list_name
+    assert (match[1]["id"], match[1]["confidence"], match[1]["_keep"]) == (item_id, confidence, keep)
+
+# --- DATES AND STATUSES ---
+@pytest.mark.parametrize("value, expected", [
+    ("2025-06-30", "2025-06-30"),
+    ("As of 2025-03-31", "2025-03-31"),
+    (datetime(2025, 6, 30, 12, 0), "2025-06-30"),
+    (pd.Timestamp("2025-09-30"), "2025-09-30"),
+    (pd.NaT, None),
+    ("Q2 2025", "2025-06-30"),
+    ("Progress report q4-2024", "2024-12-31"),
+    ("Quarterly report", None),
+    (None, None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+@pytest.mark.parametrize("value, expected", [
+    ("on track", "On Track"),
+    (" Critical ", "Critical"),
+    ("EXCEEDED", "Exceeded"),
+    ("In Progress", None),
+    (None, None),
+])
+def test_match_status(value, expected):
+    assert match_status(value) == expected
+
+def test_statuses_match_ui_vocabulary():
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "src", "types", "activity.ts")
+    with open(path) as f:
+        source = f.read()
+    ui_list = re.search(r"ACTIVITY_STATUSES = \[(.*?)\] as const", source).group(1)
+    assert re.findall(r"'([^']+)'", ui_list) == ACTIVITY_STATUSES
+
+# --- HEADER DETECTION ---
+@pytest.mark.parametrize("frame, expected_columns, expected_date", [
+    (pd.DataFrame({"Indicator ID": ["1.1"], "Value": [4]}), ["Indicator ID", "Value"], None),
+    (pd.DataFrame([["", ""], ["Indicator ID", "Value"], ["1.1", 4]], columns=["Progress report Q2 2025", "Unnamed: 1"]),
+        ["Indicator ID", "Value"], "2025-06-30"),
+    (pd.DataFrame([["Prepared 2025-03-31", ""], ["Code", "Value"], ["1.1", 4]], columns=["Title", "Unnamed: 1"]),
+        ["Code", "Value"], "2025-03-31"),
+    (pd.DataFrame({"Month": ["Jan"], "Amount": [4]}), ["Month", "Amount"], None),
+])
+def test_locate_header(frame, expected_columns, expected_date):
+    table, title_date = locate_header(frame)
+    assert list(table.columns) == expected_columns
+    assert title_date == expected_date
+
+# --- END-TO-END PRE-EXTRACTION ---
+def test_budget_sheet_is_left_to_the_model():
+    content = excel_bytes({"id": [1, 2, 3], "amount": [100, 200, 300], "date": ["2025-06-30"] * 3})
+    assert prefill(content, "budget.xlsx") is None
+
+def test_excel_title_row_gives_the_date():
+    rows = [["Progress report Q2 2025", ""], ["Indicator ID", "Value"], ["1.1", 40], ["2.1", 12]]
+    result = prefill(excel_bytes(rows, header=False), "progress.xlsx")
+    assert result["date"] == "2025-06-30"
+    assert [(u["id"], u["value"]) for u in result["indicator_updates"]] == [("1.1", 40), ("2.1", 12)]
+    assert result["residual_text"] == ""
+
+def test_excel_without_a_date_is_left_to_the_model():
+    assert prefill(excel_bytes({"Indicator ID": ["1.1"], "Value": [40]}), "progress.xlsx")["date"] is None
+
+def test_excel_extra_column_stays_in_residual():
+    content = excel_bytes({
+        "Indicator ID": ["1.1"], "Value": [40], "Amount Spent (USD)": [1200], "Date": ["2025-06-30"],
+    })
+    result = prefill(content, "progress.xlsx")
+    assert result["indicator_updates"][0]["id"] == "1.1"
+    assert "Amount Spent (USD)" in result["residual_text"]
+
+@pytest.mark.parametrize("data, residual_fragments", [
+    # Budget figures next to matched data must reach the model
+    ({"date": "2025-06-30", "summary": "Spent 12,000 USD on training", "total_spent_usd": 12000,
+      "indicators": {"1.1": 40, "2.1": 12}}, ["total_spent_usd", "Spent 12,000 USD"]),
+    # Known metadata alone is dropped
+    ({"date": "2025-06-30", "source": "Field office", "title": "Q2 report",
+      "indicators": {"1.1": 40, "2.1": 12}}, []),
+    ({"date": "2025-06-30", "records": [
+        {"indicator_id": "1.1", "value": 40},
+        {"indicator_id": "2.1", "value": 12, "comments": "Below plan", "district": "North"},
+    ]}, ["district"]),
+])
+def test_json_residual(data, residual_fragments):
+    result = prefill(json_bytes(data), "report.json")
+    assert {u["id"] for u in result["indicator_updates"]} == {"1.1", "2.1"}
+    for fragment in residual_fragments:
+        assert fragment in result["residual_text"]
+    if not residual_fragments:
+        assert result["residual_text"] == ""
+
+def test_conflicting_values_are_deferred_to_the_model():
+    data = {"date": "2025-06-30", "records": [
+        {"indicator_id": "1.1", "value": 40},
+        {"indicator_id": "1.1", "value": 45},
+        {"indicator_id": "2.1", "value": 12},
+        {"indicator_id": "2.1", "value": 12},
+    ]}
+    result = prefill(json_bytes(data), "report.json")
+    assert [(u["id"], u["value"]) for u in result["indicator_updates"]] == [("2.1", 12)]
+    assert "1.1: conflicting values (value=40; value=45)" in result["residual_text"]
+
+def test_only_the_latest_value_per_id_is_kept():
+    data = {"records": [
+        {"indicator_id": "1.1", "value": 30, "date": "2025-03-31"},
+        {"indicator_id": "1.1", "value": 40, "date": "2025-06-30"},
+    ]}
+    result = prefill(json_bytes(data), "report.json")
+    assert [(u["id"], u["value"]) for u in result["indicator_updates"]] == [("1.1", 40)]
+    assert result["residual_text"] == ""
+
+def test_rows_dated_before_the_report_are_deferred():
+    data = {"records": [
+        {"indicator_id": "1.1", "value": 40, "date": "2025-06-30"},
+        {"indicator_id": "2.1", "value": 12, "date": "2025-03-31"},
+    ]}
+    result = prefill(json_bytes(data), "report.json")
+    assert result["date"] == "2025-06-30"
+    assert [u["id"] for u in result["indicator_updates"]] == ["1.1"]
+    assert "2.1: value=12 dated 2025-03-31" in result["residual_text"]
+
+def test_unstructured_or_broken_files_return_none():
+    assert prefill(b"plain text", "report.txt") is None
+    assert prefill(b"{not json", "report.json") is None
+    assert prefill_structured_updates(json_bytes({"1.1": 4}), "report.json", set(), set()) is None
+
+# --- MERGING WITH MODEL OUTPUT ---
+def test_merge_prefers_deterministic_values_and_date():
+    prefilled = {
+        "date": "2025-06-30",
+        "indicator_updates": [{"id": "1.1", "value": 40, "narrative": "", "confidence": 0.95}],
+        "activity_updates": [],
+    }
+    model = {
+        "date": "2025-03-31",
+        "indicator_updates": [{"id": "1.1", "value": 4}, {"id": "2.1", "value": 12}],
+        "activity_updates": None,
+    }
+    merged = merge_prefilled_updates(model, prefilled)
+    assert merged["date"] == "2025-06-30"
+    assert [(u["id"], u["value"]) for u in merged["indicator_updates"]] == [("1.1", 40), ("2.1", 12)]
+    assert merged["activity_updates"] == []
+
+def test_merge_keeps_model_date_when_file_has_none():
+    prefilled = {"date": None, "indicator_updates": [], "activity_updates": []}
+    assert merge_prefilled_updates({"date": "2025-03-31"}, prefilled)["date"] == "2025-03-31"
@@ -0,0 +1,167 @@
+"""
+Query-plan regression tests for the API queries in queries.py.
+
+Builds the schema from migrations in a scratch schema of a LOCAL Postgres,
+loads a scaled-up synthetic dataset, and EXPLAINs every query the endpoints
+run. Each query declares the tables it must not seq-scan: hot lookups their
+indexed table, writes every table. The few deliberate full reads (ID lists,
+total spend) are marked FULL_READ.
+
+Usage (from backend/):
+    PLAN_CHECK_DATABASE_URL="postgresql://postgres@localhost/postgres?sslmode=disable" python -m pytest -q
+
+Skipped when PLAN_CHECK_DATABASE_URL is unset. PLAN_CHECK_SCALE (default 1)
+multiplies the synthetic row counts. Never point this at the production database.
+"""
+import os
+import pytest
+from psycopg2.extras import execute_values
+from datetime import datetime
+import queries
+from db import get_db_connection
+from migrate import apply_migrations
+
+PLAN_CHECK_DATABASE_URL = os.getenv("PLAN_CHECK_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not PLAN_CHECK_DATABASE_URL,
+    reason="PLAN_CHECK_DATABASE_URL is not set (use a local, disposable Postgres).",
+)
+
+SCALE = int(os.getenv("PLAN_CHECK_SCALE", "1"))
+ROW_COUNTS = {
+    "activities": 5000 * SCALE,
+    "indicators": 1000 * SCALE,
+    "expenditures": 200000 * SCALE,
+    "corrections": 20000 * SCALE,
+    "actuals": 100000 * SCALE,
+    "usage": 50000 * SCALE,
+}
+
+SYNTHETIC_DATA = """
+INSERT INTO activities (id, name, status, progress)
+SELECT 'A' || g, 'Synthetic activity ' || g, 'On Track', g %% 100
+FROM generate_series(1, %(activities)s) g;
+
+INSERT INTO logframe_indicators (id, parent_id, parent_desc, label, baseline, targets)
+SELECT 'I' || g, 'Output ' || (g %% 50), 'Synthetic output', 'Synthetic indicator ' || g, '0',
+       '{"2024": 10, "2025": 30, "2026": 30, "2027": 30, "total": 100}'::jsonb
+FROM generate_series(1, %(indicators)s) g;
+
+INSERT INTO budget_plan (activity_id, year, planned_amount)
+SELECT a.id, y, 10000 FROM activities a CROSS JOIN generate_series(2024, 2027) y;
+
+INSERT INTO expenditures (activity_id, amount, expenditure_date, description)
+SELECT 'A' || (1 + g %% %(activities)s), (g %% 5000) + 0.5, DATE '2024-05-26' + (g %% 1300), 'Synthetic expenditure ' || g
+FROM generate_series(1, %(expenditures)s) g;
+
+INSERT INTO ai_corrections (correction_rule, created_at)
+SELECT 'IF report mentions keyword ' || g || ', THEN ignore it.', now() - g * interval '1 minute'
+FROM generate_series(1, %(corrections)s) g;
+
+INSERT INTO performance_actuals (indicator_id, date, source, value)
+SELECT 'I' || (1 + g %% %(indicators)s), DATE '2024-05-26' + (g %% 1300), 'Synthetic report', g %% 500
+FROM generate_series(1, %(actuals)s) g;
+
+INSERT INTO narratives (indicator_id, date, source, status, narrative)
+SELECT 'I' || (1 + g %% %(indicators)s), DATE '2024-05-26' + (g %% 1300), 'Synthetic report', 'Updated', 'Synthetic narrative ' || g
+FROM generate_series(1, %(actuals)s) g;
+
+INSERT INTO ai_usage (endpoint, model, prompt_tokens, cached_tokens, completion_tokens, latency_ms, created_at)
+SELECT 'analyze-report', 'gpt-4o', 6000, (g %% 2) * 5120, 800, 4000 + g %% 3000, now() - g * interval '1 hour'
+FROM generate_series(1, %(usage)s) g;
+
+ANALYZE activities, logframe_indicators, budget_plan, expenditures, ai_corrections, performance_actuals, narratives, ai_usage;
+"""
+
+NOW = datetime.now().isoformat()
+
+ALL_TABLES = {
+    "activities", "logframe_indicators", "budget_plan", "expenditures", "ai_corrections",
+    "performance_actuals", "narratives", "ai_usage",
+}
+# Deliberate full reads: the query returns or aggregates every row of the table, so a
+# sequential scan is the expected plan and no table is forbidden.
+FULL_READ = set()
+
+# (name, sql, params, execute_values template or None, tables that must not be seq-scanned)
+PLAN_CHECKS = [
+    # Full logframe/activity lists for the prompt and the full ID sets for matching
+    ("load_project_ids: indicators", queries.SELECT_LOGFRAME_INDICATORS, None, None, FULL_READ),
+    ("load_project_ids: activities", queries.SELECT_ACTIVITIES, None, None, FULL_READ),
+    ("load_reference_ids: indicators", queries.SELECT_INDICATOR_IDS, None, None, FULL_READ),
+    ("load_reference_ids: activities", queries.SELECT_ACTIVITY_IDS, None, None, FULL_READ),
+    # Top 20 by created_at: idx_ai_corrections_created_at
+    ("load_rag_knowledge: recent corrections", queries.SELECT_RECENT_CORRECTIONS, None, None, {"ai_corrections"}),
+    # SUM over every expenditure
+    ("load_budget_context: total spent", queries.SELECT_TOTAL_SPENT, None, None, FULL_READ),
+    # Per-activity correlated sum: idx_expenditures_activity_id (covers amount)
+    ("load_budget_context: budget summary", queries.SELECT_BUDGET_SUMMARY, None, None, {"expenditures"}),
+    # Writes: plain VALUES inserts must not read any table
+    ("learn_mistake: insert correction", queries.INSERT_CORRECTION, ("rule", "text", "1", "0", ""), None, ALL_TABLES),
+    ("commit_data: performance actuals", queries.INSERT_PERFORMANCE_ACTUALS,
+        [("I1", "2026-01-31", "check", 1), ("I2", "2026-01-31", "check", 2)], "(%s, %s, %s, %s)", ALL_TABLES),
+    ("commit_data: narratives", queries.INSERT_NARRATIVES,
+        [("I1", "2026-01-31", "check", "Updated", "text")], "(%s, %s, %s, %s, %s)", ALL_TABLES),
+    # Batched update joins on the activities primary key
+    ("commit_data: activity updates", queries.UPDATE_ACTIVITIES,
+        [(50, "On Track", "", NOW, "A1"), (80, "Delayed", "", NOW, "A2"), (100, "Completed", "", NOW, "A3")],
+        queries.UPDATE_ACTIVITIES_TEMPLATE, ALL_TABLES),
+    ("commit_data: expenditures", queries.INSERT_EXPENDITURES,
+        [("A1", 100, "2026-01-31", "check")], "(%s, %s, %s, %s)", ALL_TABLES),
+    ("record_ai_usage: insert", queries.INSERT_AI_USAGE, ("analyze-report", "gpt-4o", 6000, 5120, 800, 4000), None, ALL_TABLES),
+    # Time-window summary: idx_ai_usage_created_at
+    ("ai_usage: summary", queries.SELECT_AI_USAGE_SUMMARY, (30,), None, {"ai_usage"}),
+]
+
+def explain(cur, sql, params, template):
+    """Return the JSON plan of `sql` without executing it."""
+    statement = "EXPLAIN (FORMAT JSON) " + sql
+    if template:
+        return execute_values(cur, statement, params, template=template, fetch=True)[0][0]
+    cur.execute(statement, params)
+    return cur.fetchone()[0]
+
+def seq_scanned_tables(plan_node):
+    tables = set()
+    if plan_node.get("Node Type") == "Seq Scan":
+        tables.add(plan_node.get("Relation Name"))
+    for child in plan_node.get("Plans", []):
+        tables |= seq_scanned_tables(child)
+    return tables
+
+@pytest.fixture(scope="module")
+def plan_db():
+    """Connection whose search_path points at a scratch schema with migrations and synthetic data."""
+    schema = f"plan_check_{os.getpid()}"
+    conn = get_db_connection(PLAN_CHECK_DATABASE_URL)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE SCHEMA {schema};")
+            cur.execute(f"SET search_path TO {schema};")
+        conn.commit()
+
+        apply_migrations(conn, verbose=False)
+        with conn.cursor() as cur:
+            cur.execute(SYNTHETIC_DATA, ROW_COUNTS)
+        conn.commit()
+
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+        conn.commit()
+        conn.close()
+
+@pytest.mark.parametrize(
+    "sql, params, template, forbidden",
+    [check[1:] for check in PLAN_CHECKS],
+    ids=[check[0] for check in PLAN_CHECKS],
+)
+def test_query_avoids_sequential_scan(plan_db, sql, params, template, forbidden):
+    with plan_db.cursor() as cur:
+        plan = explain(cur, sql, params, template)
+    plan_db.rollback()
+    regressions = seq_scanned_tables(plan[0]["Plan"]) & forbidden
+    assert not regressions, f"sequential scan on {', '.join(sorted(regressions))}"
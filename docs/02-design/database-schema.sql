@@ -1,6 +1,8 @@
 -- DigiGreen Youth Dashboard Database Schema
 -- Target: PostgreSQL (for Supabase)
 -- Created: 2026-02-03
+-- Deployed databases are managed by backend/migrate.py (backend/migrations/);
+-- keep this file in sync with the latest migration.
 
 -- Drop tables in reverse order of dependency if they exist, for easy re-running.
 DROP TABLE IF EXISTS contingency_plans;
@@ -16,6 +18,7 @@ DROP TABLE IF EXISTS centers;
 DROP TABLE IF EXISTS activities;
 DROP TABLE IF EXISTS project_metadata;
 DROP TABLE IF EXISTS ai_corrections;
+DROP TABLE IF EXISTS ai_usage;
 
 
 -- Table for Activities, based on activities.json
@@ -141,6 +144,7 @@ CREATE TABLE expenditures (
         (activity_id IS NULL AND support_cost_category IS NOT NULL)
     )
 );
+CREATE INDEX idx_expenditures_activity_id ON expenditures(activity_id) INCLUDE (amount);
 
 -- Table for the Risk Register, from risk_register.json
 CREATE TABLE risks (
@@ -201,4 +205,18 @@ CREATE TABLE ai_corrections (
     user_correction TEXT,
     comments TEXT,
     created_at TIMESTAMPTZ DEFAULT now() NOT NULL
-);
\ No newline at end of file
+);
+CREATE INDEX idx_ai_corrections_created_at ON ai_corrections(created_at DESC);
+
+-- Table for model token usage per call, incl. provider-side cached prompt tokens
+CREATE TABLE ai_usage (
+    id SERIAL PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER DEFAULT 0 NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now() NOT NULL
+);
+CREATE INDEX idx_ai_usage_created_at ON ai_usage(created_at);
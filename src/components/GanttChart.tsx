@@ -14,6 +14,7 @@ const STATUS_COLORS: Record<ActivityStatus, string> = {
   'Delayed': '#F59E0B',
   'Critical': '#EF4444',
   'Not Started': '#9CA3AF',
+  'Exceeded': '#10B981',
 };
 
 // Generate year markers for the timeline
@@ -2,12 +2,14 @@ import { useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import styles from './SmartUploader.module.css'
 import { ReportGenerator } from './ReportGenerator'
+import { ACTIVITY_STATUSES } from '../types/activity'
 
 // --- Types ---
 interface IndicatorUpdate {
   id: string
   value: number
   narrative: string
+  confidence?: number
 }
 
 interface ActivityUpdate {
@@ -15,6 +17,7 @@ interface ActivityUpdate {
   status: string
   progress: number
   notes: string
+  confidence?: number
 }
 
 interface BudgetUpdate {
@@ -25,6 +28,20 @@ interface BudgetUpdate {
   description: string
 }
 
+// Rule-based matches carry a confidence score; model extractions do not
+const MatchSource = ({ confidence }: { confidence?: number }) => {
+  if (confidence === undefined) return <span style={{ color: '#757575' }}>AI</span>
+  const low = confidence < 0.7
+  return (
+    <span
+      style={{ color: low ? '#e65100' : '#2e7d32', fontWeight: low ? 600 : undefined }}
+      title={low ? 'Low-confidence table match: check the value' : 'Matched directly from a table'}
+    >
+      Table · {Math.round(confidence * 100)}%
+    </span>
+  )
+}
+
 interface PreviewData {
   date: string
   source: string
@@ -378,6 +395,7 @@ export function SmartUploader() {
                     <tr>
                       <th style={{width: '100px'}}>ID</th>
                       <th style={{width: '120px'}}>Value</th>
+                      <th style={{width: '110px'}}>Source</th>
                       <th>Narrative</th>
                     </tr>
                   </thead>
@@ -397,6 +415,7 @@ export function SmartUploader() {
                               className={styles.input}
                             />
                           </td>
+                          <td><MatchSource confidence={item.confidence} /></td>
                           <td>
                             <textarea 
                               value={item.narrative} 
@@ -424,6 +443,7 @@ export function SmartUploader() {
                       <th style={{width: '100px'}}>ID</th>
                       <th style={{width: '140px'}}>Status</th>
                       <th style={{width: '80px'}}>%</th>
+                      <th style={{width: '110px'}}>Source</th>
                       <th>Notes</th>
                     </tr>
                   </thead>
@@ -437,10 +457,9 @@ export function SmartUploader() {
                             onChange={(e) => updateItem('activity_updates', idx, 'status', e.target.value)}
                             className={styles.select}
                           >
-                            <option>On Track</option>
-                            <option>Delayed</option>
-                            <option>Completed</option>
-                            <option>Critical</option>
+                            {ACTIVITY_STATUSES.map(status => (
+                              <option key={status}>{status}</option>
+                            ))}
                           </select>
                         </td>
                         <td>
@@ -451,6 +470,7 @@ export function SmartUploader() {
                             className={styles.input}
                           />
                         </td>
+                        <td><MatchSource confidence={item.confidence} /></td>
                         <td>
                           <input 
                             type="text" 
@@ -1,4 +1,7 @@
-export type ActivityStatus = 'Completed' | 'On Track' | 'Delayed' | 'Critical' | 'Not Started';
+// Shared with the upload extractor: keep in sync with ACTIVITY_STATUSES in backend/prefill.py
+export const ACTIVITY_STATUSES = ['Not Started', 'On Track', 'Delayed', 'Critical', 'Completed', 'Exceeded'] as const;
+
+export type ActivityStatus = typeof ACTIVITY_STATUSES[number];
 
 export interface Activity {
   id: string;